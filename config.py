@@ -0,0 +1,68 @@
+import logging
+import os
+import random
+from dataclasses import dataclass
+
+logger = logging.getLogger("config")
+
+LEVELING_MODES = ("text", "voice", "both")
+
+
+def parse_config_list(config_str: str) -> list:
+    try:
+        return [int(x.strip()) for x in config_str.split(",") if x.strip()]
+    except ValueError:
+        logger.error("Invalid config list: %s", config_str)
+        return []
+
+
+def get_jittered_interval(base_sec: float, jitter_sec: float) -> float:
+    return base_sec + random.uniform(0, jitter_sec)
+
+
+def parse_bool(value: str) -> bool:
+    return value.strip().lower() == "true"
+
+
+# Parsed once at startup; modules read typed attributes instead of
+# converting env strings on every loop iteration.
+@dataclass(slots=True, frozen=True)
+class Config:
+    leveling_mode: str
+    target_channels: tuple[int, ...]
+    target_vcs: tuple[int, ...]
+    greeting_file: str
+    text_interval_sec: float
+    text_jitter_sec: float
+    text_delete_enabled: bool
+    text_auto_delete_sec: float
+    voice_base_stay_sec: int
+    voice_jitter_sec: int
+    voice_cooldown_sec: int
+    voice_busy_retry_sec: int
+    timezone: str
+
+
+# Raises ValueError on malformed numeric values
+def load_config() -> Config:
+    mode = os.getenv("LEVELING_MODE", "both").strip().lower()
+    if mode not in LEVELING_MODES:
+        raise ValueError(
+            f"LEVELING_MODE must be one of {', '.join(LEVELING_MODES)}, got {mode!r}"
+        )
+
+    return Config(
+        leveling_mode=mode,
+        target_channels=tuple(parse_config_list(os.getenv("TARGET_CHANNELS", ""))),
+        target_vcs=tuple(parse_config_list(os.getenv("TARGET_VCS", ""))),
+        greeting_file=os.getenv("GREETING_FILE", "greetings.txt"),
+        text_interval_sec=float(os.getenv("TEXT_INTERVAL_SEC", "100")),
+        text_jitter_sec=float(os.getenv("TEXT_JITTER_SEC", "0")),
+        text_delete_enabled=parse_bool(os.getenv("TEXT_DELETE_ENABLED", "true")),
+        text_auto_delete_sec=float(os.getenv("TEXT_AUTO_DELETE_SEC", "3")),
+        voice_base_stay_sec=int(os.getenv("VOICE_BASE_STAY_SEC", "3600")),
+        voice_jitter_sec=int(os.getenv("VOICE_JITTER_SEC", "3600")),
+        voice_cooldown_sec=int(os.getenv("VOICE_COOLDOWN_SEC", "900")),
+        voice_busy_retry_sec=int(os.getenv("VOICE_BUSY_RETRY_SEC", "60")),
+        timezone=os.getenv("TIMEZONE", "Asia/Kolkata"),
+    )
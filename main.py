@@ -1,25 +1,60 @@
 import asyncio
+import importlib
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import signal
+import sys
 
 import discord
 from dotenv import load_dotenv
 
+from config import Config, load_config
+
 # =========================================================
 # Logging
 # =========================================================
 
+_log_listener: logging.handlers.QueueListener | None = None
+
+
 def setup_logging(level_str: str = "INFO"):
+    global _log_listener
+
     level = getattr(logging, level_str.upper(), logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("leveling.log"),
-        ],
+    formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    stream_handler = logging.StreamHandler()
+    file_handler = logging.handlers.RotatingFileHandler(
+        "leveling.log", maxBytes=10 * 1024 * 1024, backupCount=3
+    )
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    # The event loop only enqueues records; a listener thread does the I/O
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    # Gateway session chatter is only useful when debugging
+    if level > logging.DEBUG:
+        logging.getLogger("discord.gateway").setLevel(logging.WARNING)
+
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
     )
+    _log_listener.start()
+
+
+def stop_logging():
+    # Flushes any queued records before the process exits
+    if _log_listener:
+        _log_listener.stop()
 
 load_dotenv(dotenv_path=".env", override=True)
 setup_logging(os.getenv("LOG_LEVEL", "INFO"))
@@ -29,12 +64,43 @@ logger = logging.getLogger("main")
 # Discord Gateway
 # =========================================================
 
+# Decorrelated jitter: each delay is drawn from [base, 3 * previous delay],
+# capped at 30s. Callers pass the returned delay back in on the next retry.
+async def exponential_backoff(prev_delay: float, base: float = 1.0) -> float:
+    delay = min(30.0, random.uniform(base, max(base, prev_delay * 3)))
+    await asyncio.sleep(delay)
+    return delay
+
+
+# Retries 5xx responses that discord.py's HTTPClient gave up on (it already
+# waits out 429s itself); any other HTTP error, or the last failed attempt,
+# is raised to the caller. Only use for idempotent requests.
+async def _with_retry(coro_factory, *, tries: int = 3, base: float = 0.5):
+    delay = base
+    for attempt in range(tries):
+        try:
+            return await coro_factory()
+        except discord.NotFound:
+            # A 5xx can still have been applied server-side, so on a retry
+            # the target being gone means the earlier attempt succeeded
+            if attempt > 0:
+                return None
+            raise
+        except discord.HTTPException as e:
+            if attempt == tries - 1 or e.status < 500:
+                raise
+            delay = await exponential_backoff(delay, base)
+
+
 class DiscordGateway:
     def __init__(self, token: str):
         self.token = token
         self.client: discord.Client | None = None
         self.user_id: int | None = None
-        self.ready = False
+        # Set once the session is ready or resumed, cleared on disconnect;
+        # module loops wait on it
+        self.ready = asyncio.Event()
+        self._channel_cache: dict[int, discord.abc.GuildChannel] = {}
 
     async def connect(self) -> bool:
         self.client = discord.Client()
@@ -42,50 +108,95 @@ class DiscordGateway:
         @self.client.event
         async def on_connect():
             self.user_id = self.client.user.id
-            self.ready = True
+            # A fresh READY rebuilds every guild, so cached channels are
+            # stale; drop them before the module loops can resume
+            self._channel_cache.clear()
+            self.ready.set()
             logger.info("Connected as user ID %s", self.user_id)
 
-        asyncio.create_task(self.client.start(self.token))
+        @self.client.event
+        async def on_disconnect():
+            self.ready.clear()
 
-        for _ in range(60):  # ~30 seconds
-            if self.ready:
-                return True
-            await asyncio.sleep(0.5)
+        # A resumed session dispatches "resumed", not "connect"
+        @self.client.event
+        async def on_resumed():
+            self.ready.set()
 
-        logger.error("Discord gateway connection timeout")
-        return False
+        @self.client.event
+        async def on_guild_channel_delete(channel):
+            self._channel_cache.pop(channel.id, None)
+
+        @self.client.event
+        async def on_guild_remove(guild):
+            for channel_id, channel in list(self._channel_cache.items()):
+                if getattr(channel, "guild", None) and channel.guild.id == guild.id:
+                    del self._channel_cache[channel_id]
+
+        asyncio.create_task(self.client.start(self.token))
+
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout=30)
+            return True
+        except asyncio.TimeoutError:
+            logger.error("Discord gateway connection timeout")
+            return False
 
     # ---------- shared helpers ----------
 
+    def get_channel(self, channel_id: int):
+        channel = self._channel_cache.get(channel_id)
+        if channel is None:
+            channel = self.client.get_channel(channel_id)
+            if channel:
+                self._channel_cache[channel_id] = channel
+        return channel
+
     async def send_message(self, channel_id: int, content: str):
-        channel = self.client.get_channel(channel_id)
+        channel = self.get_channel(channel_id)
         if channel:
-            msg = await channel.send(content)
-            return msg.id
+            return await channel.send(content)
         return None
 
     async def delete_message(self, channel_id: int, message_id: int):
+        channel = self.get_channel(channel_id)
+        if not channel:
+            return
+        # PartialMessage.delete issues the DELETE without fetching first
+        await self.delete_message_obj(channel.get_partial_message(message_id))
+
+    async def delete_message_obj(self, msg):
         try:
-            channel = self.client.get_channel(channel_id)
-            if not channel:
-                return
-            msg = await channel.fetch_message(message_id)
-            await msg.delete()
-            logger.info("Message %s deleted from channel %s", message_id, channel_id)
+            await _with_retry(msg.delete)
+            logger.info("Message %s deleted from channel %s", msg.id, msg.channel.id)
         except Exception as e:
             logger.error(
                 "Failed to delete message %s from channel %s: %s",
-                message_id,
-                channel_id,
+                msg.id,
+                msg.channel.id,
                 e,
             )
 
+    async def leave_vc(self):
+        results = await asyncio.gather(
+            *(vc.disconnect(force=True) for vc in list(self.client.voice_clients)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Voice disconnect failed: %s", result)
+
+    async def _ensure_disconnected(self):
+        if not self.client.voice_clients:
+            return
+        await self.leave_vc()
+        await asyncio.sleep(0.5)
+
     async def join_vc(self, vc_id: int) -> bool:
         try:
-            for vc in list(self.client.voice_clients):
-                await vc.disconnect(force=True)
+            await self._ensure_disconnected()
 
-            channel = self.client.get_channel(vc_id)
+            channel = self.get_channel(vc_id)
             if isinstance(channel, discord.VoiceChannel):
                 await channel.connect()
                 logger.info("Joined VC %s", vc_id)
@@ -95,9 +206,9 @@ class DiscordGateway:
         return False
 
     def on_voice_state_update(self, callback):
-        @self.client.event
-        async def on_voice_state_update(member, before, after):
-            await callback(member, before, after)
+        # Client.dispatch looks handlers up by attribute name, so the
+        # coroutine can be installed directly without a forwarding wrapper
+        self.client.on_voice_state_update = callback
 
     async def close(self):
         if self.client:
@@ -107,69 +218,100 @@ class DiscordGateway:
 # Automation Controller
 # =========================================================
 
+# ImportError is returned rather than raised so each module can report it
+async def _import_module(name: str):
+    try:
+        return await asyncio.to_thread(importlib.import_module, name)
+    except ImportError as e:
+        return e
+
+
 class LevelingAutomation:
     def __init__(self):
         self.gateway = None
         self.text_module = None
         self.voice_module = None
-        self.config = {}
+        self.config: Config | None = None
+        self._shutdown_done = False
 
     async def initialize(self) -> bool:
         logger.info("Initializing automation")
 
-        token = os.getenv("DISCORD_TOKEN")
-        if not token or not token.strip():
+        token = os.getenv("DISCORD_TOKEN", "").strip()
+        if not token:
             logger.error("DISCORD_TOKEN missing or empty")
             return False
 
-        self.gateway = DiscordGateway(token.strip())
-
-        # Shared config ONLY (no logic here)
-        self.config = {
-            "TARGET_CHANNELS": os.getenv("TARGET_CHANNELS", ""),
-            "TARGET_VCS": os.getenv("TARGET_VCS", ""),
-            "TEXT_INTERVAL_SEC": os.getenv("TEXT_INTERVAL_SEC", "100"),
-            "TEXT_JITTER_SEC": os.getenv("TEXT_JITTER_SEC", "0"),
-            "TEXT_DELETE_ENABLED": os.getenv("TEXT_DELETE_ENABLED", "true"),
-            "TEXT_AUTO_DELETE_SEC": os.getenv("TEXT_AUTO_DELETE_SEC", "3"),
-            "VOICE_BASE_STAY_SEC": os.getenv("VOICE_BASE_STAY_SEC", "3600"),
-            "VOICE_JITTER_SEC": os.getenv("VOICE_JITTER_SEC", "3600"),
-            "VOICE_COOLDOWN_SEC": os.getenv("VOICE_COOLDOWN_SEC", "900"),
-            "VOICE_BUSY_RETRY_SEC": os.getenv("VOICE_BUSY_RETRY_SEC", "60"),
-            "TIMEZONE": os.getenv("TIMEZONE", "Asia/Kolkata"),
-        }
+        self.gateway = DiscordGateway(token)
+
+        try:
+            self.config = load_config()
+        except ValueError as e:
+            logger.error("Invalid configuration: %s", e)
+            return False
 
         logger.info("Initialization complete")
         return True
 
-    async def run(self):
-        mode = os.getenv("LEVELING_MODE", "both").lower()
+    async def run(self, stop_evt: asyncio.Event):
+        modules_task = asyncio.create_task(self._run_modules())
+        stop_task = asyncio.create_task(stop_evt.wait())
+
+        try:
+            await asyncio.wait(
+                {modules_task, stop_task},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            stop_task.cancel()
+            modules_task.cancel()
+            await asyncio.gather(modules_task, stop_task, return_exceptions=True)
+            await self.shutdown()
+
+        # Only the cancellation above is expected; surface real crashes
+        if not modules_task.cancelled() and modules_task.exception():
+            raise modules_task.exception()
+
+    async def _run_modules(self):
+        mode = self.config.leveling_mode
         logger.info("Starting mode: %s", mode)
 
-        if not await self.gateway.connect():
+        wanted = []
+        if mode in ("text", "both"):
+            wanted.append("text_module")
+        if mode in ("voice", "both"):
+            wanted.append("voice_module")
+
+        # Import the enabled modules while the gateway handshake is in flight
+        connected, *imported = await asyncio.gather(
+            self.gateway.connect(),
+            *(_import_module(name) for name in wanted),
+        )
+        if not connected:
             return
 
+        modules = dict(zip(wanted, imported))
         tasks = []
 
         # -------- TEXT MODE --------
-        if mode in ("text", "both"):
-            try:
-                from text_module import TextModule
+        if "text_module" in modules:
+            text_module = modules["text_module"]
+            if isinstance(text_module, ImportError):
+                logger.error("Text module not available: %s", text_module)
+            else:
                 logger.info("Text module enabled")
-                self.text_module = TextModule(self.gateway, self.config)
+                self.text_module = text_module.TextModule(self.gateway, self.config)
                 tasks.append(asyncio.create_task(self.text_module.run()))
-            except ImportError as e:
-                logger.error("Text module not available: %s", e)
 
         # -------- VOICE MODE --------
-        if mode in ("voice", "both"):
-            try:
-                from voice_module import VoiceModule
+        if "voice_module" in modules:
+            voice_module = modules["voice_module"]
+            if isinstance(voice_module, ImportError):
+                logger.error("Voice module not available: %s", voice_module)
+            else:
                 logger.info("Voice module enabled")
-                self.voice_module = VoiceModule(self.gateway, self.config)
+                self.voice_module = voice_module.VoiceModule(self.gateway, self.config)
                 tasks.append(asyncio.create_task(self.voice_module.run()))
-            except ImportError as e:
-                logger.error("Voice module not available: %s", e)
 
         if not tasks:
             logger.error("No modules enabled — exiting")
@@ -178,6 +320,10 @@ class LevelingAutomation:
         await asyncio.gather(*tasks)
 
     async def shutdown(self):
+        if self._shutdown_done:
+            return
+        self._shutdown_done = True
+
         logger.info("Shutting down")
 
         if self.text_module:
@@ -201,11 +347,31 @@ async def main():
     if not await app.initialize():
         return
 
+    stop_evt = asyncio.Event()
+
+    def _handle_signal():
+        stop_evt.set()
+
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
-        loop.add_signal_handler(sig, lambda: asyncio.create_task(app.shutdown()))
+        loop.add_signal_handler(sig, _handle_signal)
 
-    await app.run()
+    await app.run(stop_evt)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop has no Windows support; USE_UVLOOP=false falls back to the
+    # stdlib loop for debugging.
+    uvloop = None
+    if sys.platform != "win32" and os.getenv("USE_UVLOOP", "true").lower() == "true":
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("uvloop not installed → using the stdlib event loop")
+
+    try:
+        if uvloop:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
+    finally:
+        stop_logging()
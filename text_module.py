@@ -1,129 +1,160 @@
 import logging
 import asyncio
 import random
-import aiofiles
+from collections import deque
 import discord
-from datetime import timedelta
 
-logger = logging.getLogger("text_module")
-
-
-def get_jittered_interval(base_sec: float, jitter_sec: float) -> float:
-    return base_sec + random.uniform(0, jitter_sec)
+from config import Config, get_jittered_interval
 
-
-def parse_config_list(config_str: str) -> list:
-    try:
-        return [int(x.strip()) for x in config_str.split(",") if x.strip()]
-    except ValueError:
-        logger.error("Invalid config list: %s", config_str)
-        return []
+logger = logging.getLogger("text_module")
 
 
 class TextModule:
-    def __init__(self, gateway, config: dict):
+    def __init__(self, gateway, config: Config):
         self.gateway = gateway
         self.config = config
         self.running = False
         self.greetings = []
+        self._greeting_bag = deque()
+
+        # ---- config ----
+        self.channels = config.target_channels
+        self.base_interval = config.text_interval_sec
+        self.jitter = config.text_jitter_sec
+        self.delete_enabled = config.text_delete_enabled
+        self.delete_sec = config.text_auto_delete_sec
 
         self.min_idle_sec = 300      # 5 minutes
         self.no_vc_sleep_sec = 600   # 10 minutes
 
+    @staticmethod
+    def _read_greetings(path: str) -> list:
+        with open(path, "rb") as f:
+            text = f.read().decode("utf-16")
+        return [line for line in map(str.strip, text.split("\n")) if len(line) >= 25]
+
     async def load_greetings(self):
         try:
-            greeting_file = self.config.get("GREETING_FILE", "greetings.txt")
-            async with aiofiles.open(greeting_file, "r", encoding="utf-16") as f:
-                content = await f.read()
-                self.greetings = [
-                    line.strip()
-                    for line in content.split("\n")
-                    if line.strip() and len(line.strip()) >= 25
-                ]
-                logger.info("Loaded %d greetings", len(self.greetings))
+            self.greetings = await asyncio.to_thread(
+                self._read_greetings, self.config.greeting_file
+            )
+            logger.info("Loaded %d greetings", len(self.greetings))
         except Exception as e:
             logger.error("Failed to load greetings: %s", e)
             self.greetings = ["Keep grinding, you got this!"]
 
+    # Deals greetings from a shuffled deck so none repeats until all are used
+    def _next_greeting(self) -> str:
+        if not self._greeting_bag:
+            pool = list(self.greetings)
+            random.shuffle(pool)
+            self._greeting_bag.extend(pool)
+        return self._greeting_bag.popleft()
+
+    @staticmethod
+    async def _last_message(vc):
+        async for msg in vc.history(limit=1):
+            return msg
+        return None
+
     async def run(self):
         self.running = True
         logger.info("Text Module started")
 
         await self.load_greetings()
 
-        vc_ids = parse_config_list(self.config.get("TARGET_CHANNELS", ""))
-        if not vc_ids:
+        if not self.channels:
             logger.error("No TARGET_CHANNELS configured")
             return
 
-        base_interval = float(self.config.get("TEXT_INTERVAL_SEC", 100))
-        jitter = float(self.config.get("TEXT_JITTER_SEC", 0))
-        delete_enabled = self.config.get("TEXT_DELETE_ENABLED", "true").lower() == "true"
-        delete_sec = float(self.config.get("TEXT_AUTO_DELETE_SEC", 3))
+        # Shuffled in place each pass; self.channels stays untouched
+        vc_ids = list(self.channels)
+
+        # Hot-loop locals (LOAD_FAST instead of global + attribute lookups)
+        _shuffle = random.shuffle
+        _sleep = asyncio.sleep
+        _jittered = get_jittered_interval
 
         while self.running:
             try:
-                random.shuffle(vc_ids)
+                await self.gateway.ready.wait()
+                _shuffle(vc_ids)
                 sent = False
 
+                candidates = []
                 for vc_id in vc_ids:
-                    vc = self.gateway.client.get_channel(vc_id)
+                    vc = self.gateway.get_channel(vc_id)
 
                     if not vc or not isinstance(vc, discord.VoiceChannel):
                         continue
 
                     # ---- Condition 1: VC must be empty ----
-                    if len(vc.members) > 0:
-                        logger.info(
-                            "Skipping VC %s → %d users present",
+                    # vc.members builds a new list on every access
+                    members = vc.members
+                    if members:
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info(
+                                "Skipping VC %s → %d users present",
+                                vc_id,
+                                len(members),
+                            )
+                        continue
+
+                    candidates.append((vc_id, vc))
+
+                # ---- Condition 2: Chat must be idle ≥ 5 min ----
+                # One concurrent round of history fetches for all candidates
+                last_msgs = await asyncio.gather(
+                    *(self._last_message(vc) for _, vc in candidates),
+                    return_exceptions=True,
+                )
+                scan_now = discord.utils.utcnow()
+
+                for (vc_id, vc), last_msg in zip(candidates, last_msgs):
+                    if isinstance(last_msg, BaseException):
+                        logger.warning(
+                            "Skipping VC %s → history unavailable: %s",
                             vc_id,
-                            len(vc.members),
+                            last_msg,
                         )
                         continue
 
-                    # ---- Condition 2: Chat must be idle ≥ 5 min ----
-                    last_msg = None
-                    async for msg in vc.history(limit=1):
-                        last_msg = msg
-                        break
-
                     if last_msg:
-                        age = (
-                            discord.utils.utcnow() - last_msg.created_at
-                        ).total_seconds()
+                        age = (scan_now - last_msg.created_at).total_seconds()
                         if age < self.min_idle_sec:
-                            logger.info(
-                                "Skipping VC %s → last message %.1fs ago",
-                                vc_id,
-                                age,
-                            )
+                            if logger.isEnabledFor(logging.INFO):
+                                logger.info(
+                                    "Skipping VC %s → last message %.1fs ago",
+                                    vc_id,
+                                    age,
+                                )
                             continue
 
                     # ---- Send message ----
-                    greeting = random.choice(self.greetings)
-                    msg_id = await self.gateway.send_message(vc_id, greeting)
+                    greeting = self._next_greeting()
+                    msg = await self.gateway.send_message(vc_id, greeting)
 
-                    if msg_id:
+                    if msg:
                         logger.info(
                             "Message sent | VC=%s | msg_id=%s | content=%.40s",
                             vc_id,
-                            msg_id,
+                            msg.id,
                             greeting,
                         )
 
-                        if delete_enabled and delete_sec > 0:
+                        if self.delete_enabled and self.delete_sec > 0:
                             logger.info(
                                 "Auto-delete scheduled | VC=%s | msg_id=%s | %.2fs",
                                 vc_id,
-                                msg_id,
-                                delete_sec,
+                                msg.id,
+                                self.delete_sec,
                             )
-                            await asyncio.sleep(delete_sec)
-                            await self.gateway.delete_message(vc_id, msg_id)
+                            await _sleep(self.delete_sec)
+                            await self.gateway.delete_message_obj(msg)
                             logger.info(
                                 "Message auto-deleted | VC=%s | msg_id=%s",
                                 vc_id,
-                                msg_id,
+                                msg.id,
                             )
 
                         sent = True
@@ -134,16 +165,16 @@ class TextModule:
                         "No eligible voice chats → sleeping %d seconds",
                         self.no_vc_sleep_sec,
                     )
-                    await asyncio.sleep(self.no_vc_sleep_sec)
+                    await _sleep(self.no_vc_sleep_sec)
                     continue
 
-                wait_time = get_jittered_interval(base_interval, jitter)
+                wait_time = _jittered(self.base_interval, self.jitter)
                 logger.info("Next message in %.1f seconds", wait_time)
-                await asyncio.sleep(wait_time)
+                await _sleep(wait_time)
 
             except Exception as e:
                 logger.error("Text module error: %s", e)
-                await asyncio.sleep(5)
+                await _sleep(5)
 
     async def stop(self):
         self.running = False
@@ -6,6 +6,8 @@ from datetime import datetime, time as dtime
 import pytz
 import discord
 
+from config import Config
+
 logger = logging.getLogger("voice_module")
 
 
@@ -13,9 +15,13 @@ logger = logging.getLogger("voice_module")
 # Silent Audio Source (CRITICAL)
 # ======================================================
 
+# 20ms of silence (Opus frame size); bytes are immutable so one copy is shared
+_OPUS_SILENCE_FRAME = b'\x00' * 3840
+
+
 class SilentAudio(discord.AudioSource):
     def read(self):
-        return b'\x00' * 3840  # 20ms of silence (Opus frame size)
+        return _OPUS_SILENCE_FRAME
 
     def is_opus(self):
         return True
@@ -26,22 +32,24 @@ class SilentAudio(discord.AudioSource):
 # ======================================================
 
 class VoiceModule:
-    def __init__(self, gateway, config: dict):
+    def __init__(self, gateway, config: Config):
         self.gateway = gateway
         self.running = False
 
         # ---- config ----
-        self.vc_id = int(config.get("TARGET_VCS"))
-        self.base_stay = int(config.get("VOICE_BASE_STAY_SEC", 3600))
-        self.jitter = int(config.get("VOICE_JITTER_SEC", 3600))
-        self.cooldown = int(config.get("VOICE_COOLDOWN_SEC", 900))
-        self.busy_retry = int(config.get("VOICE_BUSY_RETRY_SEC", 60))
-        self.tz = pytz.timezone(config.get("TIMEZONE", "Asia/Kolkata"))
+        self.vc_id = config.target_vcs[0] if config.target_vcs else None
+        self.base_stay = config.voice_base_stay_sec
+        self.jitter = config.voice_jitter_sec
+        self.cooldown = config.voice_cooldown_sec
+        self.busy_retry = config.voice_busy_retry_sec
+        self.tz = pytz.timezone(config.timezone)
 
         # ---- state ----
         self.state = "IDLE"
         self.connected_since = None
         self.audio_task = None
+        # Set whenever the stay loop should re-check state early
+        self._wake = asyncio.Event()
 
     # --------------------------------------------------
     # Helpers
@@ -54,8 +62,20 @@ class VoiceModule:
         now = self.now_ist()
         return dtime(2, 0) <= now < dtime(7, 0)
 
+    def night_window_remaining(self) -> float:
+        now = datetime.now(self.tz)
+        end = now.replace(hour=7, minute=0, second=0, microsecond=0)
+        return max(0.0, (end - now).total_seconds())
+
+    async def wait_for_wake(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
     def get_target_vc(self):
-        ch = self.gateway.client.get_channel(self.vc_id)
+        ch = self.gateway.get_channel(self.vc_id)
         return ch if isinstance(ch, discord.VoiceChannel) else None
 
     def active_voice_client(self):
@@ -66,14 +86,9 @@ class VoiceModule:
 
     async def leave_voice(self):
         self.stop_audio()
-
-        for vc in list(self.gateway.client.voice_clients):
-            try:
-                await vc.disconnect(force=True)
-            except Exception:
-                pass
-
-        await asyncio.sleep(2)
+        await self.gateway.leave_vc()
+        # disconnect() already waits for the socket close; this is just settle time
+        await asyncio.sleep(0.5)
         self.connected_since = None
 
     # --------------------------------------------------
@@ -111,6 +126,7 @@ class VoiceModule:
                     logger.info("Manual VC detected → automation sleeping")
                     self.state = "MANUAL_SLEEP"
                     await self.leave_voice()
+                    self._wake.set()
 
             elif after.channel is None and self.state == "MANUAL_SLEEP":
                 logger.info("Manual session ended → automation resuming")
@@ -126,12 +142,17 @@ class VoiceModule:
             logger.info("User joined target VC → exiting immediately")
             await self.leave_voice()
             self.state = "BUSY_WAIT"
+            self._wake.set()
 
     # --------------------------------------------------
     # Main loop
     # --------------------------------------------------
 
     async def run(self):
+        if self.vc_id is None:
+            logger.error("No TARGET_VCS configured")
+            return
+
         self.running = True
         self.gateway.on_voice_state_update(self.on_voice_state_update)
 
@@ -140,6 +161,8 @@ class VoiceModule:
 
         while self.running:
             try:
+                await self.gateway.ready.wait()
+
                 if self.state == "MANUAL_SLEEP":
                     await asyncio.sleep(10)
                     continue
@@ -151,7 +174,7 @@ class VoiceModule:
                     continue
 
                 if self.state == "BUSY_WAIT":
-                    if len(vc.members) == 0:
+                    if not vc.members:
                         logger.info("Target VC empty → retrying join")
                         self.state = "IDLE"
                     else:
@@ -173,7 +196,7 @@ class VoiceModule:
                     continue
 
                 # ----- connected -----
-                self.connected_since = time.time()
+                self.connected_since = time.monotonic()
                 self.state = "CONNECTED"
                 logger.info("Voice connected successfully")
 
@@ -184,14 +207,15 @@ class VoiceModule:
                 if self.in_night_window():
                     logger.info("Night window (2–7 AM IST) → staying connected")
                     while self.running and self.state == "CONNECTED" and self.in_night_window():
-                        await asyncio.sleep(30)
+                        await self.wait_for_wake(self.night_window_remaining())
                 else:
                     stay_time = self.base_stay + random.randint(0, self.jitter)
                     logger.info("Staying for %s seconds", stay_time)
                     while self.running and self.state == "CONNECTED":
-                        if time.time() - self.connected_since >= stay_time:
+                        remaining = stay_time - (time.monotonic() - self.connected_since)
+                        if remaining <= 0:
                             break
-                        await asyncio.sleep(30)
+                        await self.wait_for_wake(remaining)
 
                 # ----- leave -----
                 if self.state == "CONNECTED":
@@ -206,5 +230,6 @@ class VoiceModule:
 
     async def stop(self):
         self.running = False
+        self._wake.set()
         await self.leave_voice()
         logger.info("Voice Module stopped")